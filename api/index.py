@@ -0,0 +1,11 @@
+"""
+Vercel Serverless Function entrypoint.
+Serves the FastAPI app from backend.py so Vercel and local/Railway
+deployments share one upload and analysis code path.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import app  # noqa: E402,F401
@@ -6,18 +6,30 @@ Run with: uvicorn backend:app --reload --host 0.0.0.0 --port 8000
 
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import Response, FileResponse
 from fastapi.staticfiles import StaticFiles
+import os
+
+# librosa's numba kernels cache compiled code next to the installed package,
+# which is read-only on serverless hosts; keep the cache on /tmp instead
+os.environ.setdefault('NUMBA_CACHE_DIR', '/tmp/numba_cache')
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import orjson
 import librosa
 from scipy import signal
-from scipy.interpolate import interp1d
+from scipy.ndimage import median_filter
+import io
+import base64
 import tempfile
-import os
 import json
 from pathlib import Path
 import warnings
 import gc
+import hashlib
+import time
+from collections import OrderedDict
 
 # Suppress specific warnings about audioread deprecation
 warnings.filterwarnings('ignore', category=FutureWarning, module='librosa')
@@ -26,6 +38,15 @@ warnings.filterwarnings('ignore', category=FutureWarning, module='librosa')
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
 MAX_AUDIO_DURATION = 60  # Max 60 seconds of audio
 
+# Analysis results are cached by a hash of the uploaded bytes: an in-memory LRU
+# backed by JSON files in RESULT_CACHE_DIR (survives warm serverless restarts),
+# pruned to the RESULT_CACHE_FILES most recently used.
+# Bump ANALYSIS_CACHE_VERSION whenever the analysis output changes.
+ANALYSIS_CACHE_VERSION = "1"
+RESULT_CACHE_SIZE = 64
+RESULT_CACHE_FILES = int(os.getenv("RESULT_CACHE_FILES", "512"))
+RESULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", "/tmp/vibrato_cache"))
+
 app = FastAPI(title="Vibrato Analyzer API", version="1.0.0")
 
 # Check audio backend availability at startup
@@ -61,20 +82,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def load_audio_file(file_path):
+def load_audio_file(content, file_ext):
     """
-    Load audio file using the best available backend.
-    Memory optimized: uses float32, resamples to 22050 Hz, enforces duration limits.
+    Load uploaded audio bytes using the best available backend.
+    Memory optimized: decodes in memory, uses float32, resamples to 22050 Hz, enforces duration limits.
     """
     import traceback
     try:
-        # Try soundfile directly first
+        # Try soundfile directly on the in-memory upload first
         import soundfile as sf
-        print(f"  → Attempting soundfile.read on: {file_path}")
-        print(f"  → File exists: {os.path.exists(file_path)}")
-        print(f"  → File size: {os.path.getsize(file_path)} bytes")
+        print(f"  → Attempting soundfile.read on upload ({len(content)} bytes)")
         
-        data, samplerate = sf.read(file_path, dtype='float32')
+        data, samplerate = sf.read(io.BytesIO(content), dtype='float32')
         
         # Convert to mono if stereo (memory efficient)
         if len(data.shape) > 1:
@@ -97,8 +116,16 @@ def load_audio_file(file_path):
         print(f"  → Full traceback:")
         traceback.print_exc()
         print(f"  → Falling back to librosa.load()")
-        # Fall back to librosa's load function with memory optimizations
-        data, sr = librosa.load(file_path, sr=22050, mono=True, dtype=np.float32)
+        # audioread needs a real file path, so only this fallback touches disk
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
+            temp_file.write(content)
+            temp_path = temp_file.name
+        
+        try:
+            # Fall back to librosa's load function with memory optimizations
+            data, sr = librosa.load(temp_path, sr=22050, mono=True, dtype=np.float32)
+        finally:
+            os.unlink(temp_path)
         
         # Check duration
         duration = len(data) / sr
@@ -107,81 +134,122 @@ def load_audio_file(file_path):
         
         return data, sr
 
-def hz_to_cents(f_hz, f_ref):
-    """Convert frequency deviation to cents relative to reference frequency."""
-    with np.errstate(divide='ignore', invalid='ignore'):
-        cents = 1200 * np.log2(f_hz / f_ref)
-        cents[~np.isfinite(cents)] = 0
-    return cents
+def frame_rms(y, frame_length, hop_length):
+    """
+    Frame-wise RMS energy, framed like librosa.feature.rms (centered, zero-padded).
+    Squares are summed with einsum over a strided view, so frames are never copied.
+    """
+    y = np.pad(y, frame_length // 2)
+    frames = sliding_window_view(y, frame_length)[::hop_length]
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+
+# YIN runs on audio resampled to this rate; amplitude analysis keeps the
+# original rate. YIN measures the period as a lag in whole samples, so the rate
+# must leave enough samples per period at FMAX (~15 at C6), not just clear
+# Nyquist: at 8 kHz vibrato on A5 and above was lost in lag quantization
+PITCH_SR = 16000
+
+# Frames this many dB below the loudest frame are treated as unvoiced
+SILENCE_DB = 40
+
+# Pitch search range, resolved once at import instead of on every request
+FMIN = float(librosa.note_to_hz('C2'))
+FMAX = float(librosa.note_to_hz('C6'))
+
+def normalized_hann(window_len):
+    """Hann window scaled to unit sum, as float32."""
+    window = signal.windows.hann(window_len)
+    return (window / window.sum()).astype(np.float32)
+
+# Smoothing kernels for the pitch and amplitude contours, built once at import
+PITCH_SMOOTHING_WINDOW = normalized_hann(11)
+AMPLITUDE_SMOOTHING_WINDOW = normalized_hann(21)
 
 def extract_pitch(y, sr):
     """
-    Extract pitch contour from audio using pYIN algorithm.
-    Memory optimized: reduced frame_length, explicit cleanup.
+    Extract pitch contour from audio using the YIN algorithm.
+    Audio is resampled to PITCH_SR first, and frames more than SILENCE_DB below
+    the loudest frame are marked unvoiced (NaN).
     """
     # Use smaller frame_length to reduce memory usage
     frame_length = 1024  # Reduced from 2048
     hop_length = 512
     
-    f0, voiced_flag, voiced_probs = librosa.pyin(
+    # YIN cost scales with sample count, so run it at PITCH_SR and scale
+    # the frame grid to keep the same frame rate in seconds
+    if sr > PITCH_SR:
+        scale = PITCH_SR / sr
+        y = librosa.resample(y, orig_sr=sr, target_sr=PITCH_SR, res_type='polyphase')
+        frame_length = int(round(frame_length * scale))
+        hop_length = int(round(hop_length * scale))
+        sr = PITCH_SR
+    
+    f0 = librosa.yin(
         y, 
-        fmin=librosa.note_to_hz('C2'),
-        fmax=librosa.note_to_hz('C6'),
+        fmin=FMIN,
+        fmax=FMAX,
         sr=sr,
         frame_length=frame_length,
         hop_length=hop_length
     )
     
+    # YIN has no voicing decision, so mark near-silent frames as unvoiced
+    # (NaN) the way pYIN did; detect_vibrato interpolates over the gaps
+    rms = frame_rms(y, frame_length, hop_length)
+    f0[librosa.amplitude_to_db(rms, ref=np.max) < -SILENCE_DB] = np.nan
+    voiced_flag = np.isfinite(f0)
+    
     times = librosa.frames_to_time(
         np.arange(len(f0)), 
         sr=sr, 
         hop_length=hop_length
     )
     
-    # Explicitly delete voiced_probs to free memory
-    del voiced_probs
-    
-    return f0, times, voiced_flag
+    # yin returns float64; keep the rest of the pipeline in float32
+    return f0.astype(np.float32), times, voiced_flag
+
+def hz_to_cents(f_hz, f_ref):
+    """Convert frequency deviation to cents relative to reference frequency."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cents = 1200 * np.log2(f_hz / f_ref)
+        cents[~np.isfinite(cents)] = 0
+    return cents
 
-def smooth_pitch(f0, window_len=11):
-    """Smooth pitch contour to remove noise."""
+def smooth_pitch(f0, window=PITCH_SMOOTHING_WINDOW):
+    """Fill unvoiced gaps in the pitch contour and smooth it with `window` to remove noise."""
     valid_mask = ~np.isnan(f0)
-    if np.sum(valid_mask) < 2:
-        return f0
-    
-    valid_indices = np.where(valid_mask)[0]
-    valid_f0 = f0[valid_mask]
-    
-    if len(valid_indices) < 2:
+    if np.count_nonzero(valid_mask) < 2:
         return f0
     
-    f = interp1d(valid_indices, valid_f0, kind='linear', 
-                 bounds_error=False, fill_value='extrapolate')
-    f0_interp = f(np.arange(len(f0)))
+    # Interpolate linearly across NaN gaps; frames before the first or after
+    # the last voiced frame hold that frame's value
+    valid_indices = np.flatnonzero(valid_mask)
+    f0_interp = np.interp(np.arange(len(f0)), valid_indices, f0[valid_mask]).astype(np.float32)
     
-    if window_len > 1 and len(f0_interp) > window_len:
-        window = signal.windows.hann(window_len)
-        f0_smooth = signal.convolve(f0_interp, window/window.sum(), mode='same')
-    else:
-        f0_smooth = f0_interp
-    
-    return f0_smooth
+    if len(f0_interp) > len(window):
+        return np.convolve(f0_interp, window, mode='same')
+    return f0_interp
 
-def detect_vibrato(f0_smooth, times, min_prominence=10.0):
-    """Detect vibrato oscillations in pitch contour."""
-    window_size = min(50, len(f0_smooth) // 10)
+def detect_vibrato(f0, times, window=PITCH_SMOOTHING_WINDOW, min_prominence=10.0):
+    """Smooth the raw pitch contour with `window` and detect vibrato oscillations in it."""
+    f0_smooth = smooth_pitch(f0, window)
+    
+    window_size = min(50, len(f0) // 10)
     if window_size < 3:
         window_size = 3
     
     kernel_size = window_size * 2 + 1
-    if kernel_size > len(f0_smooth):
-        kernel_size = len(f0_smooth) if len(f0_smooth) % 2 == 1 else len(f0_smooth) - 1
+    if kernel_size > len(f0):
+        kernel_size = len(f0) if len(f0) % 2 == 1 else len(f0) - 1
     
-    f0_mean = signal.medfilt(f0_smooth, kernel_size=kernel_size)
+    f0_mean = median_filter(f0_smooth, size=kernel_size, mode='nearest')
     pitch_deviation_cents = hz_to_cents(f0_smooth, f0_mean)
     
-    min_distance = max(3, len(f0_smooth) // 200)
+    min_distance = max(3, len(f0) // 200)
     
+    # Peaks and troughs are searched separately on purpose: a single search on
+    # |deviation| would measure prominence down to the zero crossing instead of
+    # the opposite extreme, and apply min_distance between a peak and its trough
     peaks, peak_props = signal.find_peaks(
         pitch_deviation_cents, 
         distance=min_distance, 
@@ -195,24 +263,25 @@ def detect_vibrato(f0_smooth, times, min_prominence=10.0):
     
     return pitch_deviation_cents, f0_mean, peaks, troughs
 
-def calculate_amplitude_envelope(y, sr, times):
-    """Calculate amplitude envelope and deviation from mean."""
+def compute_rms(y):
+    """Frame-wise RMS energy of the signal."""
     hop_length = 512
     frame_length = 2048
     
-    rms = librosa.feature.rms(
-        y=y, 
-        frame_length=frame_length, 
-        hop_length=hop_length
-    )[0]
-    
+    return frame_rms(y, frame_length, hop_length)
+
+def calculate_amplitude_envelope(rms, times):
+    """Calculate amplitude envelope and deviation from mean from precomputed RMS."""
     if len(rms) != len(times):
-        f = interp1d(np.linspace(0, 1, len(rms)), rms, kind='linear')
-        rms = f(np.linspace(0, 1, len(times)))
+        rms = np.interp(np.linspace(0, 1, len(times)), np.linspace(0, 1, len(rms)), rms).astype(np.float32)
     
-    # Smooth the amplitude envelope to reduce noise
-    window = signal.windows.hann(21)
-    rms_smooth = signal.convolve(rms, window/window.sum(), mode='same')
+    # Smooth the amplitude envelope to reduce noise. Only when the envelope is
+    # longer than the window: np.convolve's 'same' output is as long as the
+    # longer input, so shorter clips would lose alignment with `times`
+    if len(rms) > len(AMPLITUDE_SMOOTHING_WINDOW):
+        rms_smooth = np.convolve(rms, AMPLITUDE_SMOOTHING_WINDOW, mode='same')
+    else:
+        rms_smooth = rms
     
     # Calculate a moving baseline using median filter (like we do for pitch)
     # This removes the overall loudness trend and shows variations
@@ -225,7 +294,7 @@ def calculate_amplitude_envelope(y, sr, times):
         kernel_size = len(rms_smooth) if len(rms_smooth) % 2 == 1 else len(rms_smooth) - 1
     
     # Get the moving baseline
-    rms_baseline = signal.medfilt(rms_smooth, kernel_size=kernel_size)
+    rms_baseline = median_filter(rms_smooth, size=kernel_size, mode='nearest')
     
     # Calculate deviation from baseline as percentage
     # This shows how amplitude varies around its local mean
@@ -235,48 +304,58 @@ def calculate_amplitude_envelope(y, sr, times):
     
     return amplitude_deviation, rms_smooth, rms_baseline
 
+# Plotted series are sent as base64-encoded little-endian integers: pitch
+# deviation in tenths of a cent (int16) and normalized amplitude in 1/255
+# steps (uint8). The viewer multiplies the decoded values by these scales.
+PITCH_DEVIATION_SCALE = 0.1
+AMPLITUDE_SCALE = 1 / 255
+
+def quantize_to_base64(values, dtype, scale):
+    """Quantize values to an integer dtype in steps of `scale` and base64-encode the bytes."""
+    dtype = np.dtype(dtype)
+    info = np.iinfo(dtype)
+    quantized = np.clip(np.rint(values / scale), info.min, info.max)
+    return base64.b64encode(quantized.astype(dtype.newbyteorder('<')).tobytes()).decode('ascii')
+
 def analyze_audio_data(y, sr):
     """
     Main analysis function.
     Memory optimized: explicit cleanup, efficient data types.
     """
-    # Extract pitch first
+    # Extract pitch contour and RMS energy
     f0, times, voiced_flag = extract_pitch(y, sr)
+    rms = compute_rms(y)
     
-    # Calculate amplitude deviation (need y for this)
-    amplitude_deviation, amplitude_raw, amplitude_baseline = calculate_amplitude_envelope(y, sr, times)
+    # Calculate amplitude deviation from baseline
+    amplitude_deviation, amplitude_raw, amplitude_baseline = calculate_amplitude_envelope(rms, times)
     
-    # Normalize raw amplitude to 0-1 for the correlation graph
-    amp_min, amp_max = np.min(amplitude_raw), np.max(amplitude_raw)
+    # Normalize raw amplitude to 0-1 for the correlation graph, scaling the
+    # shifted copy in place rather than allocating another temporary
+    amp_min, amp_max = amplitude_raw.min(), amplitude_raw.max()
+    amplitude_normalized = amplitude_raw - amp_min
     if amp_max > amp_min:
-        amplitude_normalized = (amplitude_raw - amp_min) / (amp_max - amp_min)
-    else:
-        amplitude_normalized = amplitude_raw
+        amplitude_normalized /= amp_max - amp_min
     
     # Clean up audio data and intermediate amplitude data - no longer needed
-    del y, amplitude_raw, amplitude_baseline
+    del y, rms, amplitude_raw, amplitude_baseline
     gc.collect()
     
-    # Smooth pitch
-    f0_smooth = smooth_pitch(f0, window_len=11)
-    
-    # Clean up raw f0
-    del f0, voiced_flag
-    
-    # Detect vibrato
-    pitch_deviation, f0_mean, peaks, troughs = detect_vibrato(f0_smooth, times)
+    # Smooth pitch and detect vibrato
+    pitch_deviation, f0_mean, peaks, troughs = detect_vibrato(f0, times)
     
-    # Clean up intermediate data
-    del f0_smooth, f0_mean
+    # Clean up raw f0 and intermediate data
+    del f0, voiced_flag, f0_mean
     
-    # Prepare output data - convert to lists efficiently
+    # Prepare output data - float32/int32 arrays are serialized natively by orjson
     result = {
-        "times": times.tolist(),
-        "pitchDeviation": pitch_deviation.tolist(),
-        "amplitudeDeviation": amplitude_deviation.tolist(),
-        "amplitude": amplitude_normalized.tolist(),
-        "peaks": peaks.tolist(),
-        "troughs": troughs.tolist(),
+        "times": times.astype(np.float32),
+        "pitchDeviationI16": quantize_to_base64(pitch_deviation, np.int16, PITCH_DEVIATION_SCALE),
+        "pitchDeviationScale": PITCH_DEVIATION_SCALE,
+        "amplitudeDeviation": amplitude_deviation.astype(np.float32),
+        "amplitudeU8": quantize_to_base64(amplitude_normalized, np.uint8, AMPLITUDE_SCALE),
+        "amplitudeScale": AMPLITUDE_SCALE,
+        "peaks": peaks.astype(np.int32),
+        "troughs": troughs.astype(np.int32),
         "oscillations": int(len(peaks)),
         "duration": float(times[-1]),
         "sampleRate": int(sr)
@@ -288,6 +367,90 @@ def analyze_audio_data(y, sr):
     
     return result
 
+def warm_up():
+    """Analyze a short tone so numba compiles during cold start, not on the first request."""
+    sr = 22050
+    t = np.arange(sr // 2) / sr
+    y = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    f0, times, voiced_flag = extract_pitch(y, sr)
+    detect_vibrato(f0, times)
+
+warm_up()
+
+result_cache = OrderedDict()
+
+def upload_digest(content):
+    """Hash identifying an upload (and the analysis version) in the result cache."""
+    digest = hashlib.blake2b(ANALYSIS_CACHE_VERSION.encode(), digest_size=16)
+    digest.update(content)
+    return digest.hexdigest()
+
+def remember_result(digest, payload):
+    """Add a JSON payload to the in-memory LRU, evicting the oldest entries."""
+    result_cache[digest] = payload
+    result_cache.move_to_end(digest)
+    while len(result_cache) > RESULT_CACHE_SIZE:
+        result_cache.popitem(last=False)
+
+def get_cached_result(digest):
+    """Return the cached JSON payload for an upload digest, or None if it isn't cached."""
+    payload = result_cache.get(digest)
+    if payload is None:
+        cache_file = RESULT_CACHE_DIR / f"{digest}.json"
+        try:
+            payload = cache_file.read_bytes()
+            # Mark the file as recently used so pruning keeps it
+            os.utime(cache_file)
+        except OSError:
+            # Not cached, or pruned by another worker
+            return None
+    
+    remember_result(digest, payload)
+    return payload
+
+def prune_result_files():
+    """
+    Delete all but the RESULT_CACHE_FILES most recently used cache files, plus
+    temp files left behind by a worker killed before it renamed them into place.
+    """
+    # Anything older than this can't still be mid-write in another worker
+    stale_before = time.time() - 60
+    for temp_file in RESULT_CACHE_DIR.glob("*.tmp"):
+        try:
+            if temp_file.stat().st_mtime < stale_before:
+                temp_file.unlink()
+        except OSError:
+            pass
+    
+    cache_files = []
+    for cache_file in RESULT_CACHE_DIR.glob("*.json"):
+        try:
+            cache_files.append((cache_file.stat().st_mtime, cache_file))
+        except OSError:
+            pass
+    
+    cache_files.sort(reverse=True)
+    for _, cache_file in cache_files[RESULT_CACHE_FILES:]:
+        cache_file.unlink(missing_ok=True)
+
+def store_cached_result(digest, payload):
+    """Cache a JSON payload in memory and persist it to RESULT_CACHE_DIR."""
+    remember_result(digest, payload)
+    try:
+        RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename it into place, so concurrent
+        # workers never read a partially written result
+        with tempfile.NamedTemporaryFile(dir=RESULT_CACHE_DIR, suffix=".tmp", delete=False) as temp_file:
+            temp_file.write(payload)
+        try:
+            os.replace(temp_file.name, RESULT_CACHE_DIR / f"{digest}.json")
+        except OSError:
+            os.unlink(temp_file.name)
+            raise
+        prune_result_files()
+    except OSError as e:
+        print(f"  ✗ Could not persist cached result: {e}")
+
 @app.get("/api")
 async def root():
     """Health check endpoint."""
@@ -319,9 +482,6 @@ async def analyze_audio(file: UploadFile = File(...)):
             detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
         )
     
-    temp_path = None
-    
-    # Create a temporary file to store the upload
     try:
         # Read file content
         content = await file.read()
@@ -334,40 +494,37 @@ async def analyze_audio(file: UploadFile = File(...)):
                 detail=f"File too large: {file_size/1024/1024:.1f}MB (max {MAX_FILE_SIZE/1024/1024:.0f}MB)"
             )
         
-        # Write to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            temp_file.write(content)
-            temp_file.flush()
-            os.fsync(temp_file.fileno())
-            temp_path = temp_file.name
+        # Identical uploads always produce the same analysis
+        digest = upload_digest(content)
+        cached_payload = get_cached_result(digest)
+        if cached_payload is not None:
+            print(f"Serving cached analysis: {file.filename} ({digest})")
+            return Response(content=cached_payload, media_type="application/json")
+        
+        # Load and analyze the audio
+        print(f"Loading audio: {file.filename} ({file_size/1024:.0f}KB)")
+        y, sr = load_audio_file(content, file_ext)
         
         # Clean up content from memory
         del content
         gc.collect()
         
-        # Load and analyze the audio
-        print(f"Loading audio: {file.filename} ({file_size/1024:.0f}KB)")
-        y, sr = load_audio_file(temp_path)
-        
         print("Analyzing audio...")
         result = analyze_audio_data(y, sr)
         
-        # Clean up temp file
-        os.unlink(temp_path)
+        payload = orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
+        store_cached_result(digest, payload)
         
         # Force garbage collection before returning
+        del result
         gc.collect()
         
-        return JSONResponse(content=result)
+        return Response(content=payload, media_type="application/json")
     
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        # Clean up temp file if it exists
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
-        
         # Clean up and return error
         gc.collect()
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Check that pitch tracking still resolves vibrato on high voices.
+Usage: python test-pitch-tracking.py
+
+Analyzes 10 seconds of A5 (880 Hz) with a 5.5 Hz, ±20 cent vibrato through
+backend.extract_pitch and backend.detect_vibrato, and exits non-zero unless
+nearly all of its 55 oscillations are found. Run it after changing PITCH_SR,
+the hop or frame sizes, or the smoothing windows.
+"""
+
+import sys
+import numpy as np
+
+from backend import extract_pitch, detect_vibrato, PITCH_SR
+
+SAMPLE_RATE = 22050
+DURATION = 10
+FREQUENCY = 880
+VIBRATO_RATE = 5.5
+VIBRATO_CENTS = 20
+MIN_OSCILLATIONS = 45
+
+def vibrato_tone():
+    """Sine tone at FREQUENCY with a sinusoidal vibrato of ±VIBRATO_CENTS."""
+    t = np.arange(DURATION * SAMPLE_RATE) / SAMPLE_RATE
+    freq = FREQUENCY * 2 ** (VIBRATO_CENTS * np.sin(2 * np.pi * VIBRATO_RATE * t) / 1200)
+    return (0.5 * np.sin(2 * np.pi * np.cumsum(freq) / SAMPLE_RATE)).astype(np.float32)
+
+if __name__ == "__main__":
+    f0, times, voiced_flag = extract_pitch(vibrato_tone(), SAMPLE_RATE)
+    pitch_deviation, f0_mean, peaks, troughs = detect_vibrato(f0, times)
+    
+    expected = int(DURATION * VIBRATO_RATE)
+    if len(peaks) < MIN_OSCILLATIONS:
+        print(f"❌ Found {len(peaks)} of {expected} oscillations on A5 (need {MIN_OSCILLATIONS})")
+        print(f"   PITCH_SR={PITCH_SR} may be too low to track high voices")
+        sys.exit(1)
+    
+    print(f"✓ Found {len(peaks)} of {expected} oscillations on A5")
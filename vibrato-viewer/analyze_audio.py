@@ -7,75 +7,130 @@ Usage: python analyze_audio.py <audio_file> [output_json]
 import sys
 import json
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import librosa
 from scipy import signal
-from scipy.interpolate import interp1d
+from scipy.ndimage import median_filter
 
-def hz_to_cents(f_hz, f_ref):
-    """Convert frequency deviation to cents relative to reference frequency."""
-    with np.errstate(divide='ignore', invalid='ignore'):
-        cents = 1200 * np.log2(f_hz / f_ref)
-        cents[~np.isfinite(cents)] = 0
-    return cents
+# Analysis hop as a duration: 1024 samples at 44.1 kHz (~43 frames/s) is well
+# above the Nyquist rate for 4-8 Hz vibrato and halves the frames YIN analyses
+HOP_SECONDS = 1024 / 44100
+
+def hop_length_for(sr):
+    """Hop length in samples for the analysis frame rate at sample rate sr."""
+    return max(1, int(round(HOP_SECONDS * sr)))
+
+def frame_rms(y, frame_length, hop_length):
+    """
+    Frame-wise RMS energy, framed like librosa.feature.rms (centered, zero-padded).
+    Squares are summed with einsum over a strided view, so frames are never copied.
+    """
+    y = np.pad(y, frame_length // 2)
+    frames = sliding_window_view(y, frame_length)[::hop_length]
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+
+# YIN runs on audio resampled to this rate; amplitude analysis keeps the
+# original rate. YIN measures the period as a lag in whole samples, so the rate
+# must leave enough samples per period at FMAX (~15 at C6), not just clear
+# Nyquist: at 8 kHz vibrato on A5 and above was lost in lag quantization
+PITCH_SR = 16000
+
+# Frames this many dB below the loudest frame are treated as unvoiced
+SILENCE_DB = 40
+
+# Pitch search range, resolved once at import instead of on every request
+FMIN = float(librosa.note_to_hz('C2'))
+FMAX = float(librosa.note_to_hz('C6'))
+
+def normalized_hann(window_len):
+    """Hann window scaled to unit sum, as float32."""
+    window = signal.windows.hann(window_len)
+    return (window / window.sum()).astype(np.float32)
+
+# Smoothing kernels for the pitch and amplitude contours, built once at import
+PITCH_SMOOTHING_WINDOW = normalized_hann(5)
+AMPLITUDE_SMOOTHING_WINDOW = normalized_hann(11)
 
 def extract_pitch(y, sr):
-    """Extract pitch contour from audio using pYIN algorithm."""
-    f0, voiced_flag, voiced_probs = librosa.pyin(
+    """Extract pitch contour from audio using the YIN algorithm."""
+    frame_length = 2048
+    hop_length = hop_length_for(sr)
+    
+    # YIN cost scales with sample count, so run it at PITCH_SR and scale
+    # the frame grid to keep the same frame rate in seconds
+    if sr > PITCH_SR:
+        scale = PITCH_SR / sr
+        y = librosa.resample(y, orig_sr=sr, target_sr=PITCH_SR, res_type='polyphase')
+        frame_length = int(round(frame_length * scale))
+        hop_length = int(round(hop_length * scale))
+        sr = PITCH_SR
+    
+    f0 = librosa.yin(
         y, 
-        fmin=librosa.note_to_hz('C2'),
-        fmax=librosa.note_to_hz('C6'),
+        fmin=FMIN,
+        fmax=FMAX,
         sr=sr,
-        frame_length=2048
+        frame_length=frame_length,
+        hop_length=hop_length
     )
     
-    hop_length = 512
+    # YIN has no voicing decision, so mark near-silent frames as unvoiced
+    # (NaN) the way pYIN did; detect_vibrato interpolates over the gaps
+    rms = frame_rms(y, frame_length, hop_length)
+    f0[librosa.amplitude_to_db(rms, ref=np.max) < -SILENCE_DB] = np.nan
+    voiced_flag = np.isfinite(f0)
+    
     times = librosa.frames_to_time(
         np.arange(len(f0)), 
         sr=sr, 
         hop_length=hop_length
     )
     
-    return f0, times, voiced_flag
+    # yin returns float64; keep the rest of the pipeline in float32
+    return f0.astype(np.float32), times, voiced_flag
 
-def smooth_pitch(f0, window_len=11):
-    """Smooth pitch contour to remove noise."""
+def hz_to_cents(f_hz, f_ref):
+    """Convert frequency deviation to cents relative to reference frequency."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cents = 1200 * np.log2(f_hz / f_ref)
+        cents[~np.isfinite(cents)] = 0
+    return cents
+
+def smooth_pitch(f0, window=PITCH_SMOOTHING_WINDOW):
+    """Fill unvoiced gaps in the pitch contour and smooth it with `window` to remove noise."""
     valid_mask = ~np.isnan(f0)
-    if np.sum(valid_mask) < 2:
-        return f0
-    
-    valid_indices = np.where(valid_mask)[0]
-    valid_f0 = f0[valid_mask]
-    
-    if len(valid_indices) < 2:
+    if np.count_nonzero(valid_mask) < 2:
         return f0
     
-    f = interp1d(valid_indices, valid_f0, kind='linear', 
-                 bounds_error=False, fill_value='extrapolate')
-    f0_interp = f(np.arange(len(f0)))
-    
-    if window_len > 1 and len(f0_interp) > window_len:
-        window = signal.windows.hann(window_len)
-        f0_smooth = signal.convolve(f0_interp, window/window.sum(), mode='same')
-    else:
-        f0_smooth = f0_interp
+    # Interpolate linearly across NaN gaps; frames before the first or after
+    # the last voiced frame hold that frame's value
+    valid_indices = np.flatnonzero(valid_mask)
+    f0_interp = np.interp(np.arange(len(f0)), valid_indices, f0[valid_mask]).astype(np.float32)
     
-    return f0_smooth
+    if len(f0_interp) > len(window):
+        return np.convolve(f0_interp, window, mode='same')
+    return f0_interp
 
-def detect_vibrato(f0_smooth, times, min_prominence=10.0):
-    """Detect vibrato oscillations in pitch contour."""
-    window_size = min(50, len(f0_smooth) // 10)
+def detect_vibrato(f0, times, window=PITCH_SMOOTHING_WINDOW, min_prominence=10.0):
+    """Smooth the raw pitch contour with `window` and detect vibrato oscillations in it."""
+    f0_smooth = smooth_pitch(f0, window)
+    
+    window_size = min(25, len(f0) // 10)
     if window_size < 3:
         window_size = 3
     
     kernel_size = window_size * 2 + 1
-    if kernel_size > len(f0_smooth):
-        kernel_size = len(f0_smooth) if len(f0_smooth) % 2 == 1 else len(f0_smooth) - 1
+    if kernel_size > len(f0):
+        kernel_size = len(f0) if len(f0) % 2 == 1 else len(f0) - 1
     
-    f0_mean = signal.medfilt(f0_smooth, kernel_size=kernel_size)
+    f0_mean = median_filter(f0_smooth, size=kernel_size, mode='nearest')
     pitch_deviation_cents = hz_to_cents(f0_smooth, f0_mean)
     
-    min_distance = max(3, len(f0_smooth) // 200)
+    min_distance = max(2, len(f0) // 200)
     
+    # Peaks and troughs are searched separately on purpose: a single search on
+    # |deviation| would measure prominence down to the zero crossing instead of
+    # the opposite extreme, and apply min_distance between a peak and its trough
     peaks, peak_props = signal.find_peaks(
         pitch_deviation_cents, 
         distance=min_distance, 
@@ -91,26 +146,25 @@ def detect_vibrato(f0_smooth, times, min_prominence=10.0):
 
 def calculate_amplitude_envelope(y, sr, times):
     """Calculate amplitude envelope and deviation from mean."""
-    hop_length = 512
+    hop_length = hop_length_for(sr)
     frame_length = 2048
     
-    rms = librosa.feature.rms(
-        y=y, 
-        frame_length=frame_length, 
-        hop_length=hop_length
-    )[0]
+    rms = frame_rms(y, frame_length, hop_length)
     
     if len(rms) != len(times):
-        f = interp1d(np.linspace(0, 1, len(rms)), rms, kind='linear')
-        rms = f(np.linspace(0, 1, len(times)))
+        rms = np.interp(np.linspace(0, 1, len(times)), np.linspace(0, 1, len(rms)), rms).astype(np.float32)
     
-    # Smooth the amplitude envelope to reduce noise
-    window = signal.windows.hann(21)
-    rms_smooth = signal.convolve(rms, window/window.sum(), mode='same')
+    # Smooth the amplitude envelope to reduce noise. Only when the envelope is
+    # longer than the window: np.convolve's 'same' output is as long as the
+    # longer input, so shorter clips would lose alignment with `times`
+    if len(rms) > len(AMPLITUDE_SMOOTHING_WINDOW):
+        rms_smooth = np.convolve(rms, AMPLITUDE_SMOOTHING_WINDOW, mode='same')
+    else:
+        rms_smooth = rms
     
     # Calculate a moving baseline using median filter (like we do for pitch)
     # This removes the overall loudness trend and shows variations
-    window_size = min(50, len(rms_smooth) // 10)
+    window_size = min(25, len(rms_smooth) // 10)
     if window_size < 3:
         window_size = 3
     
@@ -119,7 +173,7 @@ def calculate_amplitude_envelope(y, sr, times):
         kernel_size = len(rms_smooth) if len(rms_smooth) % 2 == 1 else len(rms_smooth) - 1
     
     # Get the moving baseline
-    rms_baseline = signal.medfilt(rms_smooth, kernel_size=kernel_size)
+    rms_baseline = median_filter(rms_smooth, size=kernel_size, mode='nearest')
     
     # Calculate deviation from baseline as percentage
     # This shows how amplitude varies around its local mean
@@ -132,26 +186,23 @@ def calculate_amplitude_envelope(y, sr, times):
 def analyze_audio_file(audio_path):
     """Main analysis function."""
     print(f"Loading audio: {audio_path}", file=sys.stderr)
-    y, sr = librosa.load(audio_path, sr=None)
+    y, sr = librosa.load(audio_path, sr=None, dtype=np.float32)
     
     print("Extracting pitch...", file=sys.stderr)
     f0, times, voiced_flag = extract_pitch(y, sr)
     
-    print("Smoothing pitch...", file=sys.stderr)
-    f0_smooth = smooth_pitch(f0, window_len=11)
-    
-    print("Detecting vibrato...", file=sys.stderr)
-    pitch_deviation, f0_mean, peaks, troughs = detect_vibrato(f0_smooth, times)
+    print("Smoothing pitch and detecting vibrato...", file=sys.stderr)
+    pitch_deviation, f0_mean, peaks, troughs = detect_vibrato(f0, times)
     
     print("Calculating amplitude...", file=sys.stderr)
     amplitude_deviation, amplitude_raw, amplitude_baseline = calculate_amplitude_envelope(y, sr, times)
     
-    # Normalize raw amplitude to 0-1 for the correlation graph
-    amp_min, amp_max = np.min(amplitude_raw), np.max(amplitude_raw)
+    # Normalize raw amplitude to 0-1 for the correlation graph, scaling the
+    # shifted copy in place rather than allocating another temporary
+    amp_min, amp_max = amplitude_raw.min(), amplitude_raw.max()
+    amplitude_normalized = amplitude_raw - amp_min
     if amp_max > amp_min:
-        amplitude_normalized = (amplitude_raw - amp_min) / (amp_max - amp_min)
-    else:
-        amplitude_normalized = amplitude_raw
+        amplitude_normalized /= amp_max - amp_min
     
     # Prepare output data
     result = {
@@ -13,6 +13,33 @@ interface AnalysisData {
   oscillations: number
 }
 
+// The API sends pitch deviation and amplitude as base64-encoded little-endian
+// integers plus the scale that maps them back to cents / 0-1 amplitude
+interface AnalysisResponse extends Omit<AnalysisData, 'pitchDeviation' | 'amplitude'> {
+  pitchDeviationI16: string
+  pitchDeviationScale: number
+  amplitudeU8: string
+  amplitudeScale: number
+}
+
+const decodeQuantized = (
+  encoded: string,
+  ArrayType: Int16ArrayConstructor | Uint8ArrayConstructor,
+  scale: number
+): number[] => {
+  const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0))
+  return Array.from(new ArrayType(bytes.buffer), v => v * scale)
+}
+
+const decodeAnalysisResponse = (response: AnalysisResponse): AnalysisData => {
+  const { pitchDeviationI16, pitchDeviationScale, amplitudeU8, amplitudeScale, ...rest } = response
+  return {
+    ...rest,
+    pitchDeviation: decodeQuantized(pitchDeviationI16, Int16Array, pitchDeviationScale),
+    amplitude: decodeQuantized(amplitudeU8, Uint8Array, amplitudeScale),
+  }
+}
+
 function App() {
   const [audioFile, setAudioFile] = useState<File | null>(null)
   const [audioUrl, setAudioUrl] = useState<string>('')
@@ -68,7 +95,7 @@ function App() {
         throw new Error(errorData.detail || 'Analysis failed')
       }
       
-      const data = await response.json()
+      const data = decodeAnalysisResponse(await response.json())
       setAnalysisData(data)
       console.log('✅ Analysis complete!', data)
     } catch (error) {